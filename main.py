@@ -3,9 +3,11 @@ from discord.ext import commands
 import asyncio
 import os
 from contextlib import AsyncExitStack
+from dataclasses import dataclass
 import logging
-from collections import defaultdict, deque
-import json
+from collections import OrderedDict, deque
+import orjson
+import time
 from datetime import datetime, timedelta
 
 # MCP imports
@@ -14,7 +16,15 @@ from mcp.client.stdio import stdio_client
 
 # Claude API imports
 from anthropic import AsyncAnthropic
+import httpx
 import re
+import textwrap
+
+# uvloop isn't available on Windows, so fall back to the stock event loop there
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -24,11 +34,59 @@ load_dotenv()
 WATCH_CHANNELS = [int(id) for id in os.getenv("DISCORD_WATCH_CHANNELS", "").split(",")]
 RESULTS_CHANNEL_ID = int(os.getenv("DISCORD_RESULTS_CHANNEL_ID", 0))
 BOT_USER_ID = int(os.getenv("DISCORD_BOT_USER_ID", 0))
+# read these once rather than on every message - a server id of 0 means respond in any server
+SERVER_ID = int(os.getenv("DISCORD_SERVER_ID", 0))
+ALLOWED_USER_IDS = {int(id) for id in os.getenv("DISCORD_USER_IDS", "0").split(",")}
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = textwrap.dedent("""
+    You are a helpful assistant that can answer questions about issue information from Sentry.io - the software error tracking platform.
+
+    You are also able to use the tools provided to you by sentry to answer questions very thoroughly.
+
+    For your final response - please assume the user is a technically minded, experienced software engineer.  Remember
+    to be friendly and supportive - they might be stressed or frustrated as they are dealing with a bug or issue.
+
+    If the user gives you an sentry issue id, you can use that to help you understand which Sentry project the issue
+    is about - the format of a sentry issue id is "PROJECT_NAME-ISSUE" so from that you can determine the project
+    name when you are using the tools to look up information which will help the user not have to spell out so many
+    details.
+
+    If the user just seems to be chatting to you, you can just reply to them with a friendly, helpful message (but take on the persona
+    of someone who is really puzzled how Liz Truss became Prime Minister and that you really like cheese and cats).
+""").strip()
+
+# How long (in seconds) to cache results from read-only Sentry tools.  This is an allowlist - the
+# MCP server's tool set changes between releases, so anything not listed here is never cached
+TOOL_TTL = {
+    "get_issue_details": 120,
+    "get_trace_details": 120,
+    "get_event_attachment": 120,
+    "find_issues": 30,
+    "find_errors": 30,
+    "find_transactions": 30,
+    "find_releases": 60,
+    "find_projects": 300,
+    "find_teams": 300,
+    "find_organizations": 300,
+    "whoami": 300,
+}
+
+# Fresh questions (no conversation history) get their final answer cached for a short while
+ANSWER_CACHE_SIZE = 256
+ANSWER_CACHE_TTL = 60
+# ...unless the answer depends on when it's asked
+TIME_WORDS = re.compile(
+    r'\b(now|today|tonight|yesterday|latest|recent|recently|current|currently|last|past|'
+    r'this (morning|afternoon|evening|week|month)|minutes?|hours?)\b'
+)
+
+# How often (in seconds) to sweep out idle conversations
+MEMORY_REAP_INTERVAL = 600
+
 recent_errors = {}  # {error_key: datetime}
 COOLDOWN_MINUTES = 10
 
@@ -61,18 +119,45 @@ def extract_app_name(embed):
 
     return None
 
-def should_not_respond(message):
-    # read the allowed user ID's and convert to a list of integers
-    allowed_user_ids = [int(id) for id in os.getenv("DISCORD_USER_IDS", "0").split(",")]
+def _iter_chunks(text, limit=2000, fallback="I couldn't process that request."):
+    """Yield pieces of text no longer than limit, splitting on line boundaries where possible
+
+    Discord rejects blank messages, so whitespace-only pieces are skipped - and if that leaves
+    nothing at all, the fallback is yielded so the user always gets a reply"""
+    chunk = ""
+    yielded = False
+    for line in text.splitlines(keepends=True):
+        if len(chunk) + len(line) > limit and chunk.strip():
+            yield chunk
+            yielded = True
+            chunk = ""
+        chunk += line
+
+        # A single line that's too long on its own - split it on the last space we can
+        while len(chunk) > limit:
+            split_point = chunk.rfind(' ', 0, limit)
+            if split_point < 1:
+                split_point = limit
+            piece = chunk[:split_point]
+            if piece.strip():
+                yield piece
+                yielded = True
+            chunk = chunk[split_point:].lstrip(' ')
+
+    if chunk.strip():
+        yield chunk
+    elif not yielded:
+        yield fallback
 
+def should_not_respond(message):
     # respond to users in the list of alloweduser ids (ie, allow DM's)
-    if int(message.author.id) in allowed_user_ids:
+    if message.author.id in ALLOWED_USER_IDS:
         return False
     # ignore other DMs
     if message.guild is None:
         return True
     # don't respond to messages in servers that are not the main server
-    if int(message.guild.id) != int(os.getenv("DISCORD_SERVER_ID")):
+    if SERVER_ID and message.guild.id != SERVER_ID:
         return True
     # don't respond to bots
     if message.author.bot:
@@ -82,24 +167,48 @@ def should_not_respond(message):
     # all good, respond to the message
     return False
 
+@dataclass(slots=True)
+class MemMsg:
+    """A single message in a conversation's memory"""
+    role: str
+    content: str
+    ts: float
+
 class SentryBot(commands.Bot):
-    def __init__(self):
+    MEMORY_LEN = 10  # how many messages to remember per conversation
+
+    def __init__(self, enable_memory: bool = True):
         # Discord bot setup
-        intents = discord.Intents.default()
-        intents.message_content = True
+        # Only subscribe to the gateway events we actually handle
+        intents = discord.Intents(guilds=True, guild_messages=True, dm_messages=True, message_content=True)
         super().__init__(command_prefix='!', intents=intents)
 
-        # Initialize API clients
-        self.claude_client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        # Initialize API clients - one pooled HTTP/2 client shared by every Claude request
+        self.http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+        self.claude_client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), http_client=self.http_client)
 
         # MCP session for Sentry
         self.sentry_session = None
         self.sentry_tools = []
+        self.sentry_tools_payload = []
+        # at least one request has to be allowed through, or everything just hangs
+        self._claude_sem = asyncio.Semaphore(max(1, int(os.getenv("CLAUDE_CONCURRENCY", "4"))))
         self.exit_stack = AsyncExitStack()
-
-        # Memory storage - keep last 10 messages per user/channel
-        self.conversation_memory = defaultdict(lambda: deque(maxlen=10))
-        self.memory_timeout = timedelta(hours=2)  # Clear old conversations
+        self._tool_cache: dict[bytes, tuple[float, str]] = {}  # {key: (expires_at, result)}
+        self._answer_cache: OrderedDict[str, tuple[float, str]] = OrderedDict()  # {question: (expires_at, answer)}
+        # Bumped whenever the caches are thrown away, so lookups that were already in flight
+        # at the time know not to store their (possibly stale) results
+        self._cache_generation = 0
+
+        # Memory storage - keep last MEMORY_LEN messages per user/channel
+        self.enable_memory = enable_memory
+        self.conversation_memory: dict[str, deque] = {}
+        self.memory_timeout_seconds = 2 * 60 * 60.0  # Clear old conversations after 2 hours
+        self._reaper = None
 
     def get_memory_key(self, ctx):
         """Generate a unique key for this conversation context"""
@@ -112,44 +221,49 @@ class SentryBot(commands.Bot):
         # Option 3: Per user per channel (separate memory per user per channel)
         return f"user_{ctx.author.id}_channel_{ctx.channel.id}"
 
-    def add_to_memory(self, ctx, role: str, content: str):
-        """Add a message to conversation memory"""
-        memory_key = self.get_memory_key(ctx)
-
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now()
-        }
+    def _mem(self, memory_key: str) -> deque:
+        """Get the memory for a conversation, creating it if this is a new one"""
+        memory = self.conversation_memory.get(memory_key)
+        if memory is None:
+            memory = self.conversation_memory[memory_key] = deque(maxlen=self.MEMORY_LEN)
+        return memory
 
-        self.conversation_memory[memory_key].append(message)
+    def add_to_memory(self, memory: deque, role: str, content: str):
+        """Add a message to a conversation's memory"""
+        memory.append(MemMsg(role, content, time.monotonic()))
 
-    def get_conversation_history(self, ctx):
+    def get_conversation_history(self, memory: deque):
         """Get recent conversation history for Claude"""
-        memory_key = self.get_memory_key(ctx)
-        messages = []
-
         # Clean up old messages
-        now = datetime.now()
-        memory = self.conversation_memory[memory_key]
+        cutoff = time.monotonic() - self.memory_timeout_seconds
 
         # Remove messages older than timeout
-        while memory and now - memory[0]["timestamp"] > self.memory_timeout:
+        while memory and memory[0].ts < cutoff:
             memory.popleft()
 
         # Convert to Claude format
-        for msg in memory:
-            messages.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
-
-        return messages
+        return [{"role": msg.role, "content": msg.content} for msg in memory]
 
     async def setup_hook(self):
         """Called when the bot is starting up"""
         logger.info("Connecting to Sentry MCP server...")
         await self.connect_to_sentry()
+        self._reaper = asyncio.create_task(self._reap_memory())
+
+    async def _reap_memory(self):
+        """Periodically forget conversations (and cached tool results) that have gone stale"""
+        while True:
+            await asyncio.sleep(MEMORY_REAP_INTERVAL)
+            now = time.monotonic()
+            cutoff = now - self.memory_timeout_seconds
+
+            for memory_key in list(self.conversation_memory):
+                memory = self.conversation_memory[memory_key]
+                if not memory or memory[-1].ts < cutoff:
+                    del self.conversation_memory[memory_key]
+
+            for key in [key for key, (expires_at, _) in self._tool_cache.items() if expires_at <= now]:
+                del self._tool_cache[key]
 
     async def connect_to_sentry(self):
         """Connect to Sentry MCP server"""
@@ -179,121 +293,214 @@ class SentryBot(commands.Bot):
             tools_response = await self.sentry_session.list_tools()
             self.sentry_tools = tools_response.tools
 
-            logger.info(f"Connected to Sentry with tools: {[tool.name for tool in self.sentry_tools]}")
+            # Build the Claude tool definitions once rather than on every request
+            self.sentry_tools_payload = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "input_schema": tool.inputSchema
+                }
+                for tool in self.sentry_tools
+            ]
+
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Connected to Sentry with tools: %s", [tool.name for tool in self.sentry_tools])
 
         except Exception as e:
             logger.error(f"Failed to connect to Sentry: {e}")
             self.sentry_session = None
+            self.sentry_tools_payload = []
+
+    async def _cached_call_tool(self, name: str, tool_input: dict) -> tuple[str, bool]:
+        """Call a Sentry tool, reusing recent results for the read-only tools in TOOL_TTL
+
+        Returns the result text and whether the tool reported an error"""
+        ttl = TOOL_TTL.get(name)
+        key = None
+
+        if ttl:
+            try:
+                key = name.encode() + b"|" + orjson.dumps(tool_input, option=orjson.OPT_SORT_KEYS)
+            except TypeError:
+                # orjson can't serialise everything (eg, huge ints) - just call the tool uncached
+                pass
+
+        if key:
+            cached = self._tool_cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                logger.info("Tool cache hit: %s", name)
+                return cached[1], False
+
+        generation = self._cache_generation
+        tool_result = await self.sentry_session.call_tool(name, tool_input)
+        result_content = str(tool_result.content[0].text) if tool_result.content else "No result"
+
+        if not ttl:
+            # This tool might have changed something in Sentry (eg, update_issue), so anything
+            # we've cached could now be out of date
+            self._invalidate_caches()
+        elif key and not tool_result.isError and generation == self._cache_generation:
+            # Don't hang on to errors - the next call might succeed
+            self._tool_cache[key] = (time.monotonic() + ttl, result_content)
+
+        return result_content, bool(tool_result.isError)
+
+    def _invalidate_caches(self):
+        """Throw away all cached tool results and answers"""
+        self._tool_cache.clear()
+        self._answer_cache.clear()
+        self._cache_generation += 1
+
+    def _answer_cache_key(self, history: list, user_message: str):
+        """Get the answer cache key for a question, or None if it shouldn't be cached"""
+        # Follow-up questions depend on the conversation so far
+        if history:
+            return None
+
+        question = " ".join(user_message.lower().split())
+        if TIME_WORDS.search(question):
+            return None
+
+        return question
+
+    def _get_cached_answer(self, key: str):
+        """Look up a recent answer, dropping it if it has expired"""
+        cached = self._answer_cache.get(key)
+        if not cached:
+            return None
+
+        if cached[0] <= time.monotonic():
+            del self._answer_cache[key]
+            return None
+
+        self._answer_cache.move_to_end(key)
+        return cached[1]
+
+    def _cache_answer(self, key: str, answer: str):
+        """Remember an answer, evicting the least recently used ones once we're full"""
+        self._answer_cache[key] = (time.monotonic() + ANSWER_CACHE_TTL, answer)
+        self._answer_cache.move_to_end(key)
+        while len(self._answer_cache) > ANSWER_CACHE_SIZE:
+            self._answer_cache.popitem(last=False)
+
+    async def _exec_tool(self, content) -> dict:
+        """Run a single tool_use block from Claude and build its tool_result"""
+        logger.info("Tool call made: %s", content.name)
+        logger.info("Tool call input: %r", content.input)
 
-    async def ask_claude_with_memory(self, ctx, user_message: str):
-        """Ask Claude with conversation history"""
-        system_prompt = """
-        You are a helpful assistant that can answer questions about issue information from Sentry.io - the software error tracking platform.
-
-        You are also able to use the tools provided to you by sentry to answer questions very thoroughly.
-
-        For your final response - please assume the user is a technically minded, experienced software engineer.  Remember
-        to be friendly and supportive - they might be stressed or frustrated as they are dealing with a bug or issue.
+        try:
+            result_content, is_error = await self._cached_call_tool(
+                content.name,
+                content.input
+            )
 
-        If the user gives you an sentry issue id, you can use that to help you understand which Sentry project the issue
-        is about - the format of a sentry issue id is "PROJECT_NAME-ISSUE" so from that you can determine the project
-        name when you are using the tools to look up information which will help the user not have to spell out so many
-        details.
+            return {
+                "type": "tool_result",
+                "tool_use_id": content.id,
+                "content": result_content,
+                "is_error": is_error
+            }
 
-        If the user just seems to be chatting to you, you can just reply to them with a friendly, helpful message (but take on the persona
-        of someone who is really puzzled how Liz Truss became Prime Minister and that you really like cheese and cats).
-        """
+        except Exception as e:
+            logger.error("Tool execution error: %s", e)
+            return {
+                "type": "tool_result",
+                "tool_use_id": content.id,
+                "content": f"Error: {str(e)}",
+                "is_error": True
+            }
 
+    async def ask_claude_with_memory(self, ctx, user_message: str):
+        """Ask Claude, with conversation history if memory is enabled"""
         try:
-            # Get conversation history
-            messages = self.get_conversation_history(ctx)
-
-            # Add the new user message
-            messages.append({"role": "user", "content": user_message})
-
-            # Store user message in memory
-            self.add_to_memory(ctx, "user", user_message)
-
-            # Prepare Sentry tools for Claude
-            tools = []
-            if self.sentry_session and self.sentry_tools:
-                tools = [
-                    {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "input_schema": tool.inputSchema
-                    }
-                    for tool in self.sentry_tools
-                ]
-
-            # Keep looping until Claude gives a final answer
-            max_iterations = 10
-            iteration = 0
-
-            while iteration < max_iterations:
-                iteration += 1
-
+            # Anything that invalidates the caches from here on makes this answer unsafe to cache
+            cache_generation = self._cache_generation
+
+            if self.enable_memory:
+                # Look up this conversation's memory once for the whole request
+                memory = self._mem(self.get_memory_key(ctx))
+                history = self.get_conversation_history(memory)
+
+                # Store user message in memory
+                self.add_to_memory(memory, "user", user_message)
+            else:
+                memory = None
+                history = []
+
+            # Conversation history plus the new user message
+            messages = [*history, {"role": "user", "content": user_message}]
+
+            # Someone asked exactly this a moment ago - reuse that answer without waiting for a Claude slot
+            answer_cache_key = self._answer_cache_key(history, user_message)
+            if answer_cache_key:
+                cached_answer = self._get_cached_answer(answer_cache_key)
+                if cached_answer:
+                    logger.info("Answer cache hit")
+                    if memory is not None:
+                        self.add_to_memory(memory, "assistant", cached_answer)
+                    return cached_answer
+
+            # Cap how many requests hit Claude/Sentry at once - bursts queue up here instead
+            async with self._claude_sem:
+                # Prepare Sentry tools for Claude
+                tools = self.sentry_tools_payload if self.sentry_session else []
+
+                # Everything except the messages stays the same on each turn
                 claude_params = {
                     "model": "claude-sonnet-4-5",
                     "max_tokens": 1000,
-                    "messages": messages,
-                    "system": system_prompt
+                    "system": SYSTEM_PROMPT
                 }
 
                 if tools:
                     claude_params["tools"] = tools
 
-                response = await self.claude_client.messages.create(**claude_params)
-
-                messages.append({"role": "assistant", "content": response.content})
-
-                tool_calls_made = False
-                tool_results = []
-
-                for content in response.content:
-                    if content.type == "tool_use" and self.sentry_session:
-                        tool_calls_made = True
-                        logger.info(f"Tool call made: {content.name}")
-                        logger.info(f"Tool call input: {content.input}")
-
-                        try:
-                            tool_result = await self.sentry_session.call_tool(
-                                content.name,
-                                content.input
-                            )
-
-                            result_content = str(tool_result.content[0].text) if tool_result.content else "No result"
-
-                            tool_results.append({
-                                "type": "tool_result",
-                                "tool_use_id": content.id,
-                                "content": result_content
-                            })
-
-                        except Exception as e:
-                            logger.error(f"Tool execution error: {e}")
-                            tool_results.append({
-                                "type": "tool_result",
-                                "tool_use_id": content.id,
-                                "content": f"Error: {str(e)}"
-                            })
-
-                if tool_calls_made:
-                    messages.append({"role": "user", "content": tool_results})
-                else:
-                    # Final answer - extract text and store in memory
-                    final_text = ""
+                # Keep looping until Claude gives a final answer
+                max_iterations = 10
+                iteration = 0
+
+                while iteration < max_iterations:
+                    iteration += 1
+
+                    response = await self.claude_client.messages.create(messages=messages, **claude_params)
+
+                    messages.append({"role": "assistant", "content": response.content})
+
+                    # Sort the response into tool calls and text in a single pass
+                    tool_uses = []
+                    text_parts = []
                     for content in response.content:
-                        if content.type == "text":
-                            final_text += content.text
+                        if content.type == "tool_use" and self.sentry_session:
+                            tool_uses.append(content)
+                        elif content.type == "text":
+                            text_parts.append(content.text)
+                    tool_calls_made = bool(tool_uses)
+
+                    # Run all the tool calls from this turn concurrently - gather keeps them in order
+                    tool_results = await asyncio.gather(*[self._exec_tool(content) for content in tool_uses])
+
+                    # Don't replay answers built from a failed lookup - it might work next time.
+                    # (Write tools invalidate the caches themselves, which the generation check
+                    # below picks up)
+                    if any(result["is_error"] for result in tool_results):
+                        answer_cache_key = None
+
+                    if tool_calls_made:
+                        messages.append({"role": "user", "content": tool_results})
+                    else:
+                        # Final answer - extract text and store in memory
+                        final_text = "".join(text_parts)
 
-                    # Store Claude's response in memory
-                    if final_text:
-                        self.add_to_memory(ctx, "assistant", final_text)
+                        # Store Claude's response in memory
+                        if final_text:
+                            if memory is not None:
+                                self.add_to_memory(memory, "assistant", final_text)
+                            if answer_cache_key and cache_generation == self._cache_generation:
+                                self._cache_answer(answer_cache_key, final_text)
 
-                    return final_text if final_text else "I couldn't process that request."
+                        return final_text if final_text else "I couldn't process that request."
 
-            return "Sorry, the request took too many steps to complete."
+                return "Sorry, the request took too many steps to complete."
 
         except Exception as e:
             logger.error(f"Error asking Claude: {e}")
@@ -319,7 +526,7 @@ class SentryBot(commands.Bot):
         if message.channel.id in WATCH_CHANNELS and message.embeds:
             logger.info(f"Message from {message.author} in {message.channel.name} being processed")
             logger.info(f"Channel ID: {message.channel.id}")
-            logger.info(f"Server ID: {os.getenv('DISCORD_SERVER_ID')}")
+            logger.info(f"Server ID: {SERVER_ID}")
 
             embed = message.embeds[0]
             logger.info(f"Embed title: {embed.title}")
@@ -371,11 +578,13 @@ class SentryBot(commands.Bot):
             return
 
         if should_not_respond(message):
-            logger.info(f"Message from {message.author} ignored")
-            if message.guild is not None:
-                logger.info(f"Message from {message.author} in {message.guild.name} ignored")
-                logger.info(f"Guild ID: {message.guild.id}")
-                logger.info(f"Server ID: {os.getenv('DISCORD_SERVER_ID')}")
+            # this runs for every message we ignore, so only build the log lines if they'll be shown
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Message from {message.author} ignored")
+                if message.guild is not None:
+                    logger.debug(f"Message from {message.author} in {message.guild.name} ignored")
+                    logger.debug(f"Guild ID: {message.guild.id}")
+                    logger.debug(f"Server ID: {SERVER_ID}")
             return
 
         # Process commands first
@@ -385,56 +594,34 @@ class SentryBot(commands.Bot):
         if not message.content.startswith(self.command_prefix):
             # Check if bot was mentioned or it's a DM
             if self.user.mentioned_in(message) or isinstance(message.channel, discord.DMChannel):
-                async with message.channel.typing():
-                    # Remove the mention from the message content
-                    content = message.content.replace(f'<@{self.user.id}>', '').strip()
-                    if not content:
-                        content = "Hello!"
-
-                    response = await self.ask_claude_with_memory(message, content)
-
-                    if len(response) > 2000:
-                        # Split on word boundaries to avoid cutting words
-                        parts = []
-                        remaining = response
+                # Remove the mention from the message content
+                content = message.content.replace(f'<@{self.user.id}>', '').strip()
 
-                        while len(remaining) > 2000:
-                            # Find the last whitespace within 2000 characters
-                            chunk = remaining[:2000]
-                            last_space = chunk.rfind(' ')
-                            last_newline = chunk.rfind('\n')
+                # Just a bare mention - no need to ask Claude how to say hello
+                if not content:
+                    await message.reply("Hi! Ask me about a Sentry issue, e.g. `PROJECT-1234`.")
+                    return
 
-                            # Use the furthest whitespace character (space or newline)
-                            split_point = max(last_space, last_newline)
-
-                            # If no whitespace found within reasonable range, fall back to hard cut
-                            if split_point < 1800:  # Don't split too early
-                                split_point = 2000
-
-                            parts.append(remaining[:split_point])
-                            remaining = remaining[split_point:].lstrip()  # Remove leading whitespace
-
-                        # Add the remaining part
-                        if remaining:
-                            parts.append(remaining)
+                async with message.channel.typing():
+                    response = await self.ask_claude_with_memory(message, content)
 
-                        # Send each part
-                        for part in parts:
-                            await message.reply(part)
-                    else:
-                        await message.reply(response)
+                    for chunk in _iter_chunks(response):
+                        await message.reply(chunk)
 
     async def close(self):
         """Clean up when shutting down"""
         logger.info("Shutting down bot...")
+        if self._reaper:
+            self._reaper.cancel()
         if self.exit_stack:
             await self.exit_stack.aclose()
+        await self.http_client.aclose()
         await super().close()
 
 # Commands
 @commands.command(name='ask')
 async def ask(ctx, *, question: str):
-    """Ask about Sentry data with memory"""
+    """Ask about Sentry data (with memory, if it's enabled)"""
     if should_not_respond(ctx.message):
         logger.info(f"Message from {ctx.author} ignored")
         return
@@ -442,11 +629,8 @@ async def ask(ctx, *, question: str):
     async with ctx.typing():
         response = await ctx.bot.ask_claude_with_memory(ctx, question)
 
-        if len(response) > 2000:
-            for i in range(0, len(response), 2000):
-                await ctx.send(response[i:i+2000])
-        else:
-            await ctx.send(response)
+        for chunk in _iter_chunks(response):
+            await ctx.send(chunk)
 
 @commands.command(name='forget')
 async def forget(ctx):
@@ -455,8 +639,12 @@ async def forget(ctx):
         logger.info(f"Message from {ctx.author} ignored")
         return
 
+    if not ctx.bot.enable_memory:
+        await ctx.send("🧠 Conversation memory is disabled - there's nothing to forget!")
+        return
+
     memory_key = ctx.bot.get_memory_key(ctx)
-    ctx.bot.conversation_memory[memory_key].clear()
+    ctx.bot.conversation_memory.pop(memory_key, None)
     await ctx.send("🧠 Conversation memory cleared!")
 
 @commands.command(name='memory')
@@ -466,8 +654,13 @@ async def memory_status(ctx):
         logger.info(f"Message from {ctx.author} ignored")
         return
 
+    if not ctx.bot.enable_memory:
+        await ctx.send("💭 Conversation memory is disabled - I don't remember previous messages")
+        return
+
     memory_key = ctx.bot.get_memory_key(ctx)
-    message_count = len(ctx.bot.conversation_memory[memory_key])
+    memory = ctx.bot.conversation_memory.get(memory_key)
+    message_count = len(memory) if memory else 0
     await ctx.send(f"💭 I remember {message_count} messages from our conversation")
 
 @commands.command(name='status')
@@ -485,7 +678,7 @@ async def status(ctx):
 
 # Main execution
 async def main():
-    bot = SentryBot()
+    bot = SentryBot(enable_memory=os.getenv("ENABLE_MEMORY", "1") != "0")
     bot.add_command(ask)
     bot.add_command(forget)
     bot.add_command(memory_status)
@@ -499,4 +692,4 @@ async def main():
         await bot.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(), loop_factory=uvloop.new_event_loop if uvloop else None)